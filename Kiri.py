@@ -2,165 +2,934 @@
 import sys
 import os
 import asyncio
+import re
 import json
+import math
+import functools
 import datetime
-from pathlib import Path
+import hashlib
+import sqlite3
+import threading
+import time
+import textwrap
+import bisect
+from types import MappingProxyType
+import multiprocessing
+from collections import Counter, OrderedDict
 import fitz  # PyMuPDF
+from kiri_extract import TEXT_FLAGS, extract_pdf_text_parallel
+import httpx
 from ollama import AsyncClient
+try:
+    import pypdfium2 as pdfium # Optional, faster text extraction for PDFs read in one process
+except ImportError:
+    pdfium = None
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QGridLayout,
-    QPushButton, QProgressBar, QTextEdit, QFileDialog, QTreeWidget, QTreeWidgetItem,
+    QPushButton, QProgressBar, QTextEdit, QFileDialog, QTreeWidget, QTreeWidgetItem, QTreeView, QFileSystemModel,
     QLabel, QMessageBox, QTabWidget, QComboBox, QSplitter, QHeaderView, QLineEdit, QSpinBox, QInputDialog
 )
-from PyQt5.QtCore import Qt, QThread, pyqtSignal, QDir
+from PyQt5.QtCore import Qt, QObject, QRunnable, QThreadPool, QTimer, pyqtSignal, QDir
 from PyQt5.QtGui import QFont, QIcon, QColor, QPalette, QTextCursor # Import QTextCursor
 from docx import Document
 from docx.shared import Pt, RGBColor
 from docx.enum.text import WD_ALIGN_PARAGRAPH
+from docx.oxml import OxmlElement
+from docx.oxml.ns import qn
 
-class SummarizationWorker(QThread):
-    progress = pyqtSignal(int)
-    # Use a more general signal for output
-    output = pyqtSignal(str)
-    finished_signal = pyqtSignal(str)
+# One persistent event loop and Ollama client shared by every worker, so jobs
+# reuse the same HTTP connections instead of building a new loop per run.
+# Both are created on first use, so importing this module (as spawned extraction
+# workers may do) starts no threads and opens no connections.
+_LOOP = None
+_CLIENT = None
+_LOOP_LOCK = threading.Lock()
 
-    def __init__(self, text_data, model="gemma3:4b-it-qat", prompt_type="summary", custom_prompt="", answer_length="", is_chunked=False):
+def _event_loop():
+    """Return the shared event loop, starting it and the Ollama client on first use."""
+    global _LOOP, _CLIENT
+    with _LOOP_LOCK:
+        if _LOOP is None:
+            # Every worker thread may have DEFAULT_MAX_CONCURRENCY chunk requests open at once, so
+            # the connection pool is sized to that, and timeout=None lets long generations finish.
+            connections = DEFAULT_MAX_CONCURRENCY * QThreadPool.globalInstance().maxThreadCount()
+            _CLIENT = AsyncClient(
+                host=os.environ.get("OLLAMA_HOST", "http://localhost:11434"),
+                timeout=None,
+                limits=httpx.Limits(max_connections=connections, max_keepalive_connections=connections)
+            )
+            _LOOP = asyncio.new_event_loop()
+            threading.Thread(target=_LOOP.run_forever, name="kiri-asyncio", daemon=True).start()
+        return _LOOP
+
+def _env_int(name, default):
+    """Read an integer setting from the environment, falling back to default if unset or invalid."""
+    try:
+        return int(os.environ.get(name, default))
+    except ValueError:
+        print(f"Warning: ignoring non-integer {name}={os.environ[name]!r}", file=sys.stderr)
+        return default
+
+# Upper bound on concurrent chat requests from one worker; Ollama only runs them
+# in parallel if the server was started with OLLAMA_NUM_PARALLEL set.
+DEFAULT_MAX_CONCURRENCY = max(1, _env_int("KIRI_MAX_CONCURRENCY", 8)) # A zero semaphore would never let a request through
+# Sampling options per content type, shared by every request
+_OPTS_FACTUAL = {"temperature": 0.4, "top_p": 0.9}
+_OPTS_CREATIVE = {"temperature": 0.7, "top_p": 0.9}
+_OPTS = {
+    "summary": _OPTS_FACTUAL,
+    "brief": _OPTS_FACTUAL,
+    "qna": _OPTS_CREATIVE,
+    "questions": _OPTS_CREATIVE,
+    "professor": _OPTS_CREATIVE,
+}
+# Tokens of the PDF given to the model as Professor Mode context
+QA_CONTEXT_TOKENS = 1250 # Adjust based on model's context window
+# Size of the passages Professor Mode retrieves from PDFs longer than the context budget
+QA_PASSAGE_TOKENS = 250
+# Longer texts are summarized in chunks, since Ollama's default 4096-token context would truncate them
+FULL_TEXT_MAX_TOKENS = 3000
+# Professor Mode reads at most this much of a PDF: enough to retrieve passages from, not whole libraries
+QA_EXTRACT_MAX_CHARS = 1_000_000
+# How long Ollama keeps the model (and its prompt cache) loaded after a request
+_KEEP_ALIVE = "1h"
+# Streamed tokens are batched into one signal per this many seconds
+TOKEN_EMIT_INTERVAL = 0.05
+
+class _ResponseCache:
+    """Exact-match cache of model responses, stored in SQLite so it survives restarts."""
+
+    def __init__(self, path, expire_seconds=7 * 86400):
+        self.path = path
+        self.expire_seconds = expire_seconds
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, content TEXT, created REAL)"
+            )
+            self._conn.execute("DELETE FROM responses WHERE created < ?", (time.time() - self.expire_seconds,))
+            self._conn.commit()
+        return self._conn
+
+    @staticmethod
+    def make_key(model, messages, options):
+        payload = json.dumps([model, messages, options], sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        try:
+            with self._lock:
+                row = self._connect().execute(
+                    "SELECT content FROM responses WHERE key = ? AND created >= ?",
+                    (key, time.time() - self.expire_seconds)
+                ).fetchone()
+            return row[0] if row else None
+        except sqlite3.Error:
+            return None # A broken cache should never stop a request
+
+    def set(self, key, content):
+        try:
+            with self._lock:
+                conn = self._connect()
+                conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, content, created) VALUES (?, ?, ?)",
+                    (key, content, time.time())
+                )
+                conn.commit()
+        except sqlite3.Error:
+            pass
+
+_RESPONSE_CACHE = _ResponseCache(os.path.join(os.path.expanduser("~"), ".kiri", "llm_cache.sqlite3"))
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+# Filler words that rephrasings of the same question tend to swap in and out
+_QUESTION_STOPWORDS = frozenset((
+    "a", "an", "the", "of", "to", "in", "on", "for", "and", "or", "is", "are", "was", "were",
+    "be", "what", "whats", "explain", "describe", "define", "tell", "me",
+    "about", "please", "can", "could", "you", "give", "by", "this", "that"
+))
+
+class SemanticCache:
+    """Reuses Professor Mode answers when a question about the same PDF is a close rephrasing."""
+
+    def __init__(self, path, threshold=0.92, max_entries=500):
+        self.path = path # Append-only log, one entry per line
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.entries = None # Loaded on first use
+        self.logged_entries = 0 # Lines in the log, including entries since evicted
+
+    # Bumped whenever embed() changes, so vectors stored by older versions are ignored
+    EMBED_VERSION = 3
+
+    @staticmethod
+    def embed(question):
+        """Return a unit-length vector of the question's words and word pairs.
+
+        The pairs keep word order, so "does x cause y" and "does y cause x" do not match.
+        """
+        # Drop apostrophes first so "what's" becomes the stopword "whats", not "what" plus a stray "s"
+        text = question.lower().replace("'", "").replace("\u2019", "")
+        words = [word for word in _WORD_RE.findall(text) if word not in _QUESTION_STOPWORDS]
+        counts = Counter(words)
+        counts.update(f"{first} {second}" for first, second in zip(words, words[1:]))
+        norm = math.sqrt(sum(c * c for c in counts.values()))
+        return {word: c / norm for word, c in counts.items()} if norm else {}
+
+    def _load(self):
+        if self.entries is None:
+            self.entries = []
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        self.logged_entries += 1
+                        try:
+                            entry = json.loads(line)
+                        except ValueError:
+                            continue # Skip a line cut short by a crash mid-write
+                        if isinstance(entry, dict) and entry.get("version") == self.EMBED_VERSION:
+                            self.entries.append(entry)
+            except Exception:
+                pass
+            del self.entries[:-self.max_entries]
+        return self.entries
+
+    def lookup(self, question, pdf_sha, answer_length):
+        vector = self.embed(question)
+        if not vector:
+            return None
+        best_score, best_answer = 0.0, None
+        for entry in self._load():
+            if entry["pdf_sha"] != pdf_sha or entry["answer_length"] != answer_length:
+                continue
+            other = entry["vector"]
+            score = sum(weight * other.get(word, 0.0) for word, weight in vector.items())
+            if score > best_score:
+                best_score, best_answer = score, entry["answer"]
+        return best_answer if best_score >= self.threshold else None
+
+    def add(self, question, pdf_sha, answer_length, answer):
+        """Remember an answer and return a callable that saves it, or None if there is nothing to save.
+
+        The callable only touches the log file, so the caller can run it off the GUI thread.
+        """
+        vector = self.embed(question)
+        if not vector:
+            return None
+        entries = self._load()
+        entry = {
+            "version": self.EMBED_VERSION, "pdf_sha": pdf_sha, "answer_length": answer_length,
+            "vector": vector, "answer": answer
+        }
+        entries.append(entry)
+        del entries[:-self.max_entries]
+        self.logged_entries += 1
+        if self.logged_entries > 2 * self.max_entries:
+            # Rewrite the log once evicted entries make up half of it
+            self.logged_entries = len(entries)
+            return functools.partial(self._write, compacted=list(entries))
+        return functools.partial(self._write, records=[entry])
+
+    def _write(self, records=(), compacted=None):
+        """Append records to the log, or atomically replace it with the compacted entries."""
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            if compacted is None:
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.writelines(json.dumps(entry, separators=(',', ':')) + "\n" for entry in records)
+                return
+            tmp_file = self.path + ".tmp"
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                f.writelines(json.dumps(entry, separators=(',', ':')) + "\n" for entry in compacted)
+            os.replace(tmp_file, self.path)
+        except OSError:
+            pass # The cache is an optimisation; answers still work without it
+
+class ChunkIndex:
+    """BM25 index over a document's chunks, used to pick Professor Mode context for a question."""
+
+    K1 = 1.5
+    B = 0.75
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.term_counts = [Counter(_WORD_RE.findall(chunk.lower())) for chunk in chunks]
+        self.lengths = [sum(counts.values()) for counts in self.term_counts]
+        self.avg_length = sum(self.lengths) / len(chunks) if chunks else 0.0
+        doc_freq = Counter()
+        for counts in self.term_counts:
+            doc_freq.update(counts.keys())
+        self.idf = {term: math.log(1 + (len(chunks) - df + 0.5) / (df + 0.5)) for term, df in doc_freq.items()}
+
+    def context_for(self, question, max_chars):
+        """Join the chunks that best match the question, in document order, up to max_chars."""
+        terms = {word for word in _WORD_RE.findall(question.lower()) if word not in _QUESTION_STOPWORDS and word in self.idf}
+        scores = []
+        for counts, length in zip(self.term_counts, self.lengths):
+            norm = self.K1 * (1 - self.B + self.B * length / (self.avg_length or 1))
+            scores.append(sum(
+                self.idf[term] * counts[term] * (self.K1 + 1) / (counts[term] + norm)
+                for term in terms if term in counts
+            ))
+        picked, used = [], 0
+        # sorted() is stable, so unmatched questions fall back to the start of the document
+        for i in sorted(range(len(self.chunks)), key=lambda i: -scores[i]):
+            size = len(self.chunks[i]) + 2
+            if used + size <= max_chars:
+                picked.append(i)
+                used += size
+        return "\n\n".join(self.chunks[i] for i in sorted(picked))
+
+# --- Black and Blue Theme ---
+_KIRI_QSS = """
+/* Main window background */
+QMainWindow, QWidget {
+    background-color: #000000; /* Black */
+    color: #00ccff; /* Bright Blue text */
+}
+/* Buttons */
+QPushButton {
+    background-color: #003366; /* Dark Blue */
+    color: #ffffff; /* White text */
+    border: 1px solid #0055aa; /* Medium Blue border */
+    padding: 10px 15px;
+    border-radius: 6px;
+    font-weight: 600;
+    font-size: 13px;
+}
+QPushButton:hover {
+    background-color: #0055aa; /* Medium Blue */
+}
+QPushButton:pressed {
+    background-color: #0077cc; /* Lighter Blue */
+}
+QPushButton:disabled {
+    background-color: #333333; /* Dark Gray */
+    color: #666666; /* Light Gray text */
+    border: 1px solid #444444;
+}
+/* Text Edits */
+QTextEdit {
+    background-color: #001122; /* Very Dark Blue-Black */
+    color: #00ccff; /* Bright Blue text */
+    border: 1px solid #004477; /* Darker Blue border */
+    border-radius: 6px;
+    padding: 10px;
+    font-family: 'Segoe UI', sans-serif;
+    font-size: 11pt;
+    selection-background-color: #0055aa; /* Medium Blue */
+    selection-color: #ffffff; /* White */
+}
+QTextEdit:disabled {
+    background-color: #000a11; /* Even darker */
+    color: #0088aa; /* Muted Blue */
+}
+/* Progress Bar */
+QProgressBar {
+    border: 1px solid #004477;
+    border-radius: 6px;
+    text-align: center;
+    height: 20px;
+    background-color: #001122; /* Dark background */
+}
+QProgressBar::chunk {
+    background-color: #0066cc; /* Blue chunk */
+    border-radius: 5px;
+}
+/* Labels */
+QLabel {
+    color: #00ccff; /* Bright Blue text */
+    font-size: 13px;
+}
+/* Tab Widget */
+QTabWidget::pane {
+    border: 1px solid #004477;
+    border-radius: 6px;
+    padding: 5px;
+    background-color: #000000; /* Black */
+}
+QTabBar::tab {
+    background: #002244; /* Very Dark Blue */
+    border: 1px solid #004477;
+    padding: 8px 15px;
+    margin-right: 2px;
+    border-top-left-radius: 4px;
+    border-top-right-radius: 4px;
+    color: #00ccff; /* Bright Blue text */
+}
+QTabBar::tab:selected {
+    background: #003366; /* Dark Blue */
+    color: #ffffff; /* White text */
+    font-weight: bold;
+}
+QTabBar::tab:hover:!selected {
+    background: #004477; /* Slightly lighter on hover */
+}
+/* Tree Views */
+QTreeView {
+    background-color: #001122; /* Very Dark Blue-Black */
+    alternate-background-color: #000a11; /* Slightly different shade */
+    color: #00ccff; /* Bright Blue text */
+    border: 1px solid #004477;
+    border-radius: 6px;
+    gridline-color: #003366; /* Dark Blue lines */
+}
+QTreeView::item {
+    padding: 3px;
+}
+QTreeView::item:selected {
+    background-color: #003366; /* Dark Blue */
+    color: #ffffff; /* White text */
+}
+QTreeView::item:hover {
+    background-color: #002244; /* Slightly lighter on hover */
+}
+QHeaderView::section {
+    background-color: #002244; /* Very Dark Blue header */
+    color: #00ccff; /* Bright Blue text */
+    padding: 5px;
+    border: 1px solid #003366;
+    font-weight: bold;
+}
+/* Combo Boxes */
+QComboBox {
+    background-color: #002244; /* Very Dark Blue */
+    color: #00ccff; /* Bright Blue text */
+    border: 1px solid #004477;
+    border-radius: 4px;
+    padding: 5px;
+    min-height: 20px;
+}
+QComboBox:disabled {
+    background-color: #001122;
+    color: #0088aa;
+}
+QComboBox QAbstractItemView {
+    background-color: #001122; /* Dropdown background */
+    border: 1px solid #004477;
+    selection-background-color: #003366; /* Dark Blue selection */
+    selection-color: #ffffff; /* White text */
+}
+/* Spin Boxes */
+QSpinBox {
+    background-color: #002244; /* Very Dark Blue */
+    color: #00ccff; /* Bright Blue text */
+    border: 1px solid #004477;
+    border-radius: 4px;
+    padding: 5px;
+}
+QSpinBox:disabled {
+    background-color: #001122;
+    color: #0088aa;
+}
+QSpinBox::up-button, QSpinBox::down-button {
+    background-color: #003366; /* Dark Blue buttons */
+    border: 1px solid #004477;
+    subcontrol-origin: border;
+    width: 16px;
+}
+QSpinBox::up-button:hover, QSpinBox::down-button:hover {
+    background-color: #0055aa; /* Medium Blue on hover */
+}
+/* Status Bar */
+QStatusBar {
+    background-color: #001122; /* Very Dark Blue-Black */
+    color: #00ccff; /* Bright Blue text */
+    border-top: 1px solid #003366;
+}
+/* Scrollbars */
+QScrollBar:vertical {
+    background-color: #001122;
+    width: 15px;
+    margin: 15px 3px 15px 3px;
+    border: 1px solid #003366;
+    border-radius: 4px;
+}
+QScrollBar::handle:vertical {
+    background-color: #003366;
+    min-height: 20px;
+    border-radius: 4px;
+}
+QScrollBar::handle:vertical:hover {
+    background-color: #0055aa;
+}
+QScrollBar::add-line:vertical, QScrollBar::sub-line:vertical {
+    background-color: #002244;
+    height: 12px;
+    subcontrol-origin: margin;
+    border: 1px solid #003366;
+}
+QScrollBar:horizontal {
+    background-color: #001122;
+    height: 15px;
+    margin: 3px 15px 3px 15px;
+    border: 1px solid #003366;
+    border-radius: 4px;
+}
+QScrollBar::handle:horizontal {
+    background-color: #003366;
+    min-width: 20px;
+    border-radius: 4px;
+}
+QScrollBar::handle:horizontal:hover {
+    background-color: #0055aa;
+}
+QScrollBar::add-line:horizontal, QScrollBar::sub-line:horizontal {
+    background-color: #002244;
+    width: 12px;
+    subcontrol-origin: margin;
+    border: 1px solid #003366;
+}
+"""
+
+@functools.lru_cache(maxsize=None)
+def _dark_palette():
+    """Build the dark palette once; it needs a QApplication, so it cannot be built at import."""
+    dark_palette = QPalette()
+    dark_palette.setColor(QPalette.Window, QColor(0, 0, 0)) # Black
+    dark_palette.setColor(QPalette.WindowText, QColor(0, 204, 255)) # Bright Blue
+    dark_palette.setColor(QPalette.Base, QColor(0, 17, 34)) # Very Dark Blue-Black
+    dark_palette.setColor(QPalette.AlternateBase, QColor(0, 10, 17)) # Slightly different shade
+    dark_palette.setColor(QPalette.ToolTipBase, QColor(0, 204, 255)) # Bright Blue
+    dark_palette.setColor(QPalette.ToolTipText, QColor(0, 0, 0)) # Black
+    dark_palette.setColor(QPalette.Text, QColor(0, 204, 255)) # Bright Blue
+    dark_palette.setColor(QPalette.Disabled, QPalette.Text, QColor(0, 136, 170)) # Muted Blue
+    dark_palette.setColor(QPalette.Button, QColor(0, 51, 102)) # Dark Blue
+    dark_palette.setColor(QPalette.ButtonText, QColor(255, 255, 255)) # White
+    dark_palette.setColor(QPalette.BrightText, QColor(255, 0, 0)) # Red (for errors/alerts)
+    dark_palette.setColor(QPalette.Link, QColor(0, 102, 204)) # Blue Link
+    dark_palette.setColor(QPalette.Highlight, QColor(0, 85, 170)) # Medium Blue
+    dark_palette.setColor(QPalette.HighlightedText, QColor(255, 255, 255)) # White
+    dark_palette.setColor(QPalette.PlaceholderText, QColor(0, 136, 170)) # Muted Blue
+    return dark_palette
+
+_PARA_RE = re.compile(r"\n\s*\n")
+_SENTENCE_END_RE = re.compile(r"(?<=\.)\s+")
+
+# Rough characters-per-token ratio used to size chunks without running a tokenizer
+_CHARS_PER_TOKEN = 4
+
+# Coarsest boundary first: paragraphs, then sentences, then any whitespace
+_SPLIT_LEVELS = (
+    (_PARA_RE, "\n\n"),
+    (re.compile(r"(?<=[.!?])\s+"), " "),
+    (re.compile(r"\s+"), " "),
+)
+# A trailing chunk with less new text than this is folded into the chunk before it
+_MIN_CHUNK_TOKENS = 100
+
+def _recursive_split(text, max_tokens=1500, overlap=100):
+    """Split text into chunks of at most max_tokens (estimated), breaking at the coarsest boundary that fits.
+
+    Each chunk after the first repeats the last ~overlap tokens of the previous one.
+    """
+    max_chars = max_tokens * _CHARS_PER_TOKEN
+    overlap_chars = min(overlap, max_tokens // 2) * _CHARS_PER_TOKEN
+    chunks = []
+    head, body, body_len = "", [], 0
+    # Segments leave room for the overlap so a chunk never exceeds max_chars
+    for segment, sep in _segments(text, max_chars - overlap_chars):
+        if body and len(head) + body_len + len(sep) + len(segment) > max_chars:
+            chunks.append((head + "".join(body)).strip())
+            head = _overlap_tail(chunks[-1], overlap_chars)
+            body, body_len = [], 0
+        if body or chunks:
+            body.append(sep)
+            body_len += len(sep)
+        body.append(segment)
+        body_len += len(segment)
+    if body:
+        if chunks and body_len < _MIN_CHUNK_TOKENS * _CHARS_PER_TOKEN:
+            chunks[-1] += "".join(body)
+        else:
+            chunks.append((head + "".join(body)).strip())
+    return chunks
+
+def _segments(text, max_chars, level=0, lead="\n\n"):
+    """Yield (segment, separator) pairs of at most max_chars; single words longer than that stay whole."""
+    pattern, joiner = _SPLIT_LEVELS[level]
+    sep = lead
+    for part in pattern.split(text):
+        part = part.strip()
+        if not part:
+            continue
+        if len(part) <= max_chars or level + 1 == len(_SPLIT_LEVELS):
+            yield part, sep
+        else:
+            yield from _segments(part, max_chars, level + 1, sep)
+        sep = joiner
+
+def _overlap_tail(chunk, max_chars):
+    """Return the last max_chars of chunk, starting on a word boundary."""
+    if max_chars <= 0:
+        return ""
+    if len(chunk) <= max_chars:
+        return chunk
+    words = chunk[-max_chars:].split(None, 1)
+    return words[1] if len(words) > 1 else words[0]
+
+# Line formats for Word export; each named group selects how a matching line is written
+_DOCX_LINE_RES = {
+    "qna": re.compile(r"(?P<question>Q:.*)|A:\s*(?P<answer>.*)"),
+    "questions": re.compile(r"\d+[.)]\s+(?P<number>.*)"),
+    "summary": re.compile(r"(?P<rule>---.*)|•\s*(?P<bullet>.*)|-\s*(?P<sub_bullet>.*)"),
+}
+
+def _docx_paragraph(text, style_id=None, bold=False):
+    """Build a <w:p> element holding one run of text."""
+    p = OxmlElement('w:p')
+    if style_id:
+        p_pr = OxmlElement('w:pPr')
+        p_style = OxmlElement('w:pStyle')
+        p_style.set(qn('w:val'), style_id)
+        p_pr.append(p_style)
+        p.append(p_pr)
+    r = OxmlElement('w:r')
+    if bold:
+        r_pr = OxmlElement('w:rPr')
+        r_pr.append(OxmlElement('w:b'))
+        r.append(r_pr)
+    t = OxmlElement('w:t')
+    t.set(qn('xml:space'), 'preserve')
+    t.text = text
+    r.append(t)
+    p.append(r)
+    return p
+
+# Rewrite the notes log once it holds this many superseded or deleted records
+NOTES_COMPACT_THRESHOLD = 50
+# Notes changes made within this many milliseconds are written to disk together
+NOTES_FLUSH_DELAY_MS = 500
+
+# Number of extracted PDF texts kept in memory
+PDF_TEXT_CACHE_SIZE = 8
+# PDFs with at least this many pages are extracted by several processes at once.
+# Text-dense pages measured ~1.5 ms each; the worker pool costs ~90 ms to start,
+# once, and ~1 ms per use after that, so from here even the first large PDF is
+# no slower on two cores than a single in-process pass.
+PARALLEL_EXTRACT_MIN_PAGES = 128
+# Neither PyMuPDF nor pdfium may be used from two threads at once (pdfium not even on
+# different documents), and the file pickers can start extractions that overlap on the
+# I/O pool, so in-process extraction with either library takes this first
+_PDF_LOCK = threading.Lock()
+
+def _extract_text_pdfium(file_path, page_count, max_chars=None):
+    """Extract pages [0, page_count) with pdfium, stopping after the page that reaches max_chars.
+
+    The caller must hold _PDF_LOCK.
+    """
+    pdf = pdfium.PdfDocument(file_path)
+    try:
+        parts, length = [], 0
+        for i in range(page_count):
+            page = pdf[i]
+            textpage = page.get_textpage()
+            # pdfium ends lines with \r\n; use \n and end each page with one, as PyMuPDF does
+            parts.append(textpage.get_text_range().replace("\r\n", "\n") + "\n")
+            textpage.close()
+            page.close()
+            length += len(parts[-1])
+            if max_chars and length >= max_chars:
+                break
+        return "".join(parts)
+    finally:
+        pdf.close()
+
+async def _prewarm(model):
+    """Load the model into Ollama's memory ahead of the first real request."""
+    try:
+        # An empty message list makes Ollama load the model without generating anything
+        await _CLIENT.chat(model=model, messages=[], keep_alive=_KEEP_ALIVE)
+    except Exception:
+        pass # Ollama is not reachable yet; the first real request will report it
+
+class SummarizationTask(QRunnable):
+    """One summarization job, run on the shared QThreadPool."""
+
+    class Signals(QObject):
+        progress = pyqtSignal(int)
+        # Use a more general signal for output
+        output = pyqtSignal(str)
+        # Response text as it is generated, for the single-request paths
+        token = pyqtSignal(str)
+        # (chunk index, result) for each chunk as it finishes, in completion order
+        chunk_done = pyqtSignal(int, str)
+        finished_signal = pyqtSignal(str)
+
+    # Different prompts for different content types
+    PROMPTS = MappingProxyType({
+        "summary": (
+            "You are an expert note-taking assistant specializing in creating structured, "
+            "detailed summaries. Create a comprehensive summary of the provided text. "
+            "Focus on key facts, important concepts, and critical takeaways. "
+            "Organize information logically with clear sections and paragraphs. "
+            "Do not use markdown or special formatting in your response."
+        ),
+        "brief": (
+            "Create a concise brief overview of the following text. "
+            "Focus on the most important concepts and key takeaways. "
+            "Use a clear paragraph structure."
+        ),
+        "qna": (
+            "Generate 5 important questions and detailed answers based on the following text. "
+            "Format each pair clearly as:\n"
+            "Q: [Question]\n"
+            "A: [Detailed answer]\n"
+            "Separate each pair with a blank line."
+        ),
+        "questions": (
+            "Create 10 practice questions based on the following text. "
+            "Include a mix of multiple choice, short answer, and discussion questions. "
+            "Number each question clearly."
+        ),
+        "combine": (
+            "You are given partial summaries of consecutive sections of one document. "
+            "Merge them into a single cohesive summary that keeps every key fact, "
+            "removes repetition, and follows the order of the original document. "
+            "Do not use markdown or special formatting in your response."
+        ),
+        # Appended to a content type's prompt when merging results from several chunks
+        "merge": (
+            "The text below holds drafts written from consecutive sections of one document. "
+            "Merge them into a single response that follows the instructions above, "
+            "dropping repeated items and numbering any items from 1."
+        ),
+        # Used when professor mode is not given its own prompt
+        "professor_default": (
+            "You are a helpful professor assistant. Answer questions about the provided text "
+            "in a clear, educational manner. Provide detailed explanations and examples where appropriate."
+        )
+    })
+
+    def __init__(self, text_data, model="gemma3:4b-it-qat", prompt_type="summary", custom_prompt="", answer_length="", is_chunked=False, max_concurrency=None, context=""):
         super().__init__()
+        self.signals = self.Signals()
         self.text_data = text_data # Can be full text (str) or chunks (list)
         self.model = model
         self.prompt_type = prompt_type
         self.custom_prompt = custom_prompt
         self.answer_length = answer_length
         self.is_chunked = is_chunked # Flag to indicate if text_data is a list of chunks
-        self.client = AsyncClient()
+        self.max_concurrency = max(1, max_concurrency or DEFAULT_MAX_CONCURRENCY)
+        self.context = context # Document text for professor mode; text_data is then the question
         self.result = "" # Store the final combined result
 
-        # Different prompts for different content types
-        self.prompts = {
-            "summary": (
-                "You are an expert note-taking assistant specializing in creating structured, "
-                "detailed summaries. Create a comprehensive summary of the provided text. "
-                "Focus on key facts, important concepts, and critical takeaways. "
-                "Organize information logically with clear sections and paragraphs. "
-                "Do not use markdown or special formatting in your response."
-            ),
-            "brief": (
-                "Create a concise brief overview of the following text. "
-                "Focus on the most important concepts and key takeaways. "
-                "Use a clear paragraph structure."
-            ),
-            "qna": (
-                "Generate 5 important questions and detailed answers based on the following text. "
-                "Format each pair clearly as:\n"
-                "Q: [Question]\n"
-                "A: [Detailed answer]\n"
-                "Separate each pair with a blank line."
-            ),
-            "questions": (
-                "Create 10 practice questions based on the following text. "
-                "Include a mix of multiple choice, short answer, and discussion questions. "
-                "Number each question clearly."
-            ),
-            "professor": self.custom_prompt if self.custom_prompt else (
-                "You are a helpful professor assistant. Answer questions about the provided text "
-                "in a clear, educational manner. Provide detailed explanations and examples where appropriate."
-            )
-        }
+    def base_prompt(self):
+        """System prompt for this worker's content type."""
+        if self.prompt_type == "professor":
+            return self.custom_prompt or self.PROMPTS["professor_default"]
+        return self.PROMPTS.get(self.prompt_type, self.PROMPTS["summary"])
+
+    async def chat(self, messages, options, keep_alive=_KEEP_ALIVE, stream=False):
+        """Send one chat request, answering from the response cache when possible.
+
+        With stream=True the response is also emitted piece by piece through `signals.token`.
+        """
+        key = _RESPONSE_CACHE.make_key(self.model, messages, options)
+        # SQLite blocks, so it runs off the shared event loop that every worker's requests use
+        cached = await asyncio.to_thread(_RESPONSE_CACHE.get, key)
+        if cached is not None:
+            if stream:
+                self.signals.token.emit(cached)
+            return cached
+        if stream:
+            parts = []
+            pending = [] # Tokens not yet sent to the GUI
+            last_emit = time.monotonic()
+            async for part in await _CLIENT.chat(model=self.model, messages=messages, options=options, keep_alive=keep_alive, stream=True):
+                token = part['message']['content']
+                if token:
+                    parts.append(token)
+                    pending.append(token)
+                    now = time.monotonic()
+                    if now - last_emit >= TOKEN_EMIT_INTERVAL:
+                        self.signals.token.emit("".join(pending))
+                        pending.clear()
+                        last_emit = now
+            if pending:
+                self.signals.token.emit("".join(pending))
+            content = "".join(parts)
+        else:
+            response = await _CLIENT.chat(model=self.model, messages=messages, options=options, keep_alive=keep_alive)
+            content = response['message']['content']
+        await asyncio.to_thread(_RESPONSE_CACHE.set, key, content)
+        return content
 
     async def process_full_text(self, text):
         """Process the entire text as a single unit."""
         try:
-            self.output.emit("Sending full text to model...")
-            base_prompt = self.prompts.get(self.prompt_type, self.prompts["summary"])
+            self.signals.output.emit("Sending full text to model...")
+            base_prompt = self.base_prompt()
 
+            if self.prompt_type == "professor" and self.context:
+                # The document goes in the system message so every question about it shares
+                # the same prefix and Ollama can reuse its prompt cache; only the user
+                # message (question and answer length) changes between turns.
+                prompt = f"{base_prompt}\n\nContext text:\n{self.context}"
+                if self.answer_length:
+                    text = f"Answer length: {self.answer_length}. {text}"
             # Modify prompt based on answer length requirement (mainly for professor mode)
-            if self.answer_length and self.prompt_type == "professor":
+            elif self.answer_length and self.prompt_type == "professor":
                 length_prompt = f"Answer length: {self.answer_length}. "
                 prompt = length_prompt + base_prompt
             else:
                 prompt = base_prompt
 
-            response = await self.client.chat(
-                model=self.model,
+            self.result = await self.chat(
                 messages=[
                     {"role": "system", "content": prompt},
                     {"role": "user", "content": text} # Send the whole text
                 ],
-                options={
-                    "temperature": 0.4 if self.prompt_type in ["summary", "brief"] else 0.7,
-                    "top_p": 0.9
-                }
+                options=_OPTS.get(self.prompt_type, _OPTS_CREATIVE),
+                stream=True
             )
-            self.result = response['message']['content']
-            self.progress.emit(100)
-            self.output.emit("Processing complete.")
+            self.signals.progress.emit(100)
+            self.signals.output.emit("Processing complete.")
         except Exception as e:
             error_msg = f"[ERROR] Failed to process text: {str(e)}"
             self.result = error_msg
-            self.output.emit(error_msg)
+            self.signals.output.emit(error_msg)
 
     async def process_chunks(self, chunks):
         """Process text in chunks (fallback or for specific content types)."""
-        self.output.emit(f"Split into {len(chunks)} chunks for processing...")
-        semaphore = asyncio.Semaphore(2) # Limit concurrent requests
-        summaries = []
+        self.signals.output.emit(f"Split into {len(chunks)} chunks for processing...")
+        semaphore = asyncio.Semaphore(self.max_concurrency) # Limit concurrent requests
+        completed = 0
+
+        # The system message and options are the same for every chunk
+        base_prompt = self.base_prompt()
+        if self.answer_length and self.prompt_type == "professor":
+            length_prompt = f"Answer length: {self.answer_length}. "
+            prompt = length_prompt + base_prompt
+        else:
+            prompt = base_prompt
+        system_message = {"role": "system", "content": prompt}
+        options = _OPTS.get(self.prompt_type, _OPTS_CREATIVE)
 
         async def process_chunk(chunk, index):
+            nonlocal completed
             async with semaphore:
                 try:
-                    self.output.emit(f"Processing chunk {index+1}/{len(chunks)}...")
-                    base_prompt = self.prompts.get(self.prompt_type, self.prompts["summary"])
-
-                    if self.answer_length and self.prompt_type == "professor":
-                        length_prompt = f"Answer length: {self.answer_length}. "
-                        prompt = length_prompt + base_prompt
-                    else:
-                        prompt = base_prompt
-
-                    response = await self.client.chat(
-                        model=self.model,
-                        messages=[
-                            {"role": "system", "content": prompt},
-                            {"role": "user", "content": chunk}
-                        ],
-                        options={
-                            "temperature": 0.4 if self.prompt_type in ["summary", "brief"] else 0.7,
-                            "top_p": 0.9
-                        }
+                    self.signals.output.emit(f"Processing chunk {index+1}/{len(chunks)}...")
+                    summary = await self.chat(
+                        messages=[system_message, {"role": "user", "content": chunk}],
+                        options=options
                     )
-                    summary = response['message']['content']
-                    summaries.append(summary)
-                    self.progress.emit(int((index + 1) / len(chunks) * 100))
                 except Exception as e:
-                    error_msg = f"[ERROR] Processing chunk {index+1}: {str(e)}"
-                    self.output.emit(error_msg)
-                    summaries.append(error_msg)
+                    summary = f"[ERROR] Processing chunk {index+1}: {str(e)}"
+                    self.signals.output.emit(summary)
+                completed += 1
+                self.signals.chunk_done.emit(index, summary)
+                self.signals.progress.emit(int(completed / len(chunks) * 100))
+                return summary
 
+        # gather() returns results in chunk order, whatever order they finish in
         tasks = [process_chunk(chunk, i) for i, chunk in enumerate(chunks)]
-        await asyncio.gather(*tasks)
+        summaries = await asyncio.gather(*tasks)
 
         # Combine results
-        if self.prompt_type == "summary":
-            # For summaries, try to create a cohesive whole (this is simplistic)
-            self.result = "\n\n--- SECTION BREAK ---\n\n".join(summaries)
-        else:
-            # For other types, just join
-            self.result = "\n\n".join(summaries)
+        self.result = await self.combine_summaries(summaries)
+
+    async def combine_summaries(self, summaries):
+        """Merge partial results with one final request, falling back to section breaks.
+
+        Partials too long for one request are first merged in groups, as many times as needed.
+        """
+        if len(summaries) > 1 and not any("[ERROR]" in summary for summary in summaries):
+            if self.prompt_type == "summary":
+                prompt = self.PROMPTS["combine"]
+            else:
+                # Keep the original instructions (question counts, format) for the merged result
+                prompt = f"{self.base_prompt()}\n\n{self.PROMPTS['merge']}"
+            system_message = {"role": "system", "content": prompt}
+            semaphore = asyncio.Semaphore(self.max_concurrency)
+
+            async def merge(text, stream=False):
+                async with semaphore:
+                    return await self.chat(
+                        messages=[system_message, {"role": "user", "content": text}],
+                        options=_OPTS_FACTUAL,
+                        stream=stream
+                    )
+
+            try:
+                self.signals.output.emit("Combining partial summaries...")
+                merged = "\n\n".join(summaries)
+                while len(merged) > FULL_TEXT_MAX_TOKENS * _CHARS_PER_TOKEN:
+                    groups = _recursive_split(merged, overlap=0)
+                    self.signals.output.emit(f"Merging partial results in {len(groups)} groups...")
+                    summaries = await asyncio.gather(*(merge(group) for group in groups))
+                    shorter = "\n\n".join(summaries)
+                    if len(shorter) >= len(merged):
+                        break # Not getting shorter; keep the groups' results as sections
+                    merged = shorter
+                else:
+                    return await merge(merged, stream=True)
+            except Exception as e:
+                self.signals.output.emit(f"[ERROR] Failed to combine summaries: {str(e)}")
+        combined = "\n\n--- SECTION BREAK ---\n\n".join(summaries)
+        self.signals.token.emit(combined)
+        return combined
 
     def run(self):
         try:
             if isinstance(self.text_data, str) and not self.is_chunked:
                 # Run the single text processing coroutine
-                asyncio.run(self.process_full_text(self.text_data))
+                asyncio.run_coroutine_threadsafe(self.process_full_text(self.text_data), _event_loop()).result()
             elif isinstance(self.text_data, list) or self.is_chunked:
                 # Run the chunked processing coroutine
-                chunks = self.text_data if isinstance(self.text_data, list) else [self.text_data]
-                asyncio.run(self.process_chunks(chunks))
+                chunks = self.text_data if isinstance(self.text_data, list) else _recursive_split(self.text_data)
+                asyncio.run_coroutine_threadsafe(self.process_chunks(chunks), _event_loop()).result()
             else:
                 raise ValueError("Invalid text_data type for processing")
         except Exception as e:
             self.result = f"[FATAL ERROR] {str(e)}"
-        self.finished_signal.emit(self.result)
+        self.signals.finished_signal.emit(self.result)
+
+
+class ExtractTask(QRunnable):
+    """Extracts PDF text off the GUI thread, on the app's I/O thread pool."""
+
+    class Signals(QObject):
+        text_ready = pyqtSignal(str)
+        error = pyqtSignal(str)
+
+    def __init__(self, file_path, extract_fn):
+        super().__init__()
+        self.signals = self.Signals()
+        self.file_path = file_path
+        self.extract_fn = extract_fn # Callable taking the path and returning the text
+
+    def run(self):
+        try:
+            text = self.extract_fn(self.file_path)
+        except Exception as e:
+            self.signals.error.emit(str(e))
+            return
+        self.signals.text_ready.emit(text)
+
+
+class WriteTask(QRunnable):
+    """Runs one queued file write (notes log, answer cache) off the GUI thread."""
+
+    class Signals(QObject):
+        error = pyqtSignal(str)
+
+    def __init__(self, write_fn):
+        super().__init__()
+        self.signals = self.Signals()
+        self.write_fn = write_fn # Callable doing the file I/O
+
+    def run(self):
+        try:
+            self.write_fn()
+        except Exception as e:
+            self.signals.error.emit(str(e))
 
 
 class PDFManagerApp(QMainWindow):
@@ -169,13 +938,35 @@ class PDFManagerApp(QMainWindow):
         self.setWindowTitle("kiri")
         self.setGeometry(100, 100, 1100, 800)
         # --- Black and Blue Theme ---
-        self.setStyleSheet(self.get_black_blue_stylesheet())
+        self.setStyleSheet(_KIRI_QSS)
         # Apply dark palette for better theme consistency
         self.set_dark_palette()
         # Data storage
-        self.notes_file = "pdf_notes.json"
+        self.notes_file = "pdf_notes.jsonl" # Append-only log, one record per line
+        self.legacy_notes_file = "pdf_notes.json" # Old single-object format, migrated on load
+        self.stale_note_records = 0
+        self.pending_note_records = [] # Log records not yet written to disk
+        self.notes_items = {} # Note id -> its row in the notes list
+        self.notes_order = [] # Sorted (created, id) of the rows, for bisecting insertions
         self.notes = self.load_notes()
         self.current_pdf_text = ""
+        self.current_pdf_sha = ""
+        self.professor_context = "" # Whole PDF when it fits, so every question sends identical bytes
+        self.professor_index = None # Passage index for PDFs too long to send whole
+        self.chunk_indexes = OrderedDict() # PDF sha -> ChunkIndex, for recently used PDFs
+        self.pdf_text_cache = OrderedDict() # (path, mtime_ns, size) -> extracted text
+        self.pdf_text_lock = threading.Lock()
+        # Extraction and note writes get their own threads so they never wait behind
+        # model requests, which hold a global pool thread for the whole generation
+        self.io_pool = QThreadPool(self)
+        # A single thread runs file writes one at a time in the order they were queued,
+        # so an append never lands before an earlier compaction replaces the file
+        self.write_pool = QThreadPool(self)
+        self.write_pool.setMaxThreadCount(1)
+        self.streaming_areas = set() # Text areas currently receiving a streamed response
+        self.stream_buffers = {} # Text area -> (prefix, streamed text waiting to be drawn)
+        self.status_buffers = {} # Text area -> status messages waiting to be drawn
+        self.qa_cache = SemanticCache(os.path.join(os.path.expanduser("~"), ".kiri", "qa_cache.jsonl"))
         # Store the PDF filename for export
         self.current_pdf_filename = ""
         # Store the generated topic for export
@@ -191,236 +982,34 @@ class PDFManagerApp(QMainWindow):
         # Tab widget
         self.tab_widget = QTabWidget()
         self.main_layout.addWidget(self.tab_widget)
-        # Create tabs
-        self.create_file_browser_tab()
-        self.create_processor_tab()
-        self.create_notes_tab()
-        self.create_content_generator_tab()
-        self.create_professor_mode_tab()
+        # Create tabs; each one's widgets are only built the first time it is shown
+        self.tab_builders = {}
+        for attr, title, builder in (
+            ("browser_tab", "File Browser", self.create_file_browser_tab),
+            ("processor_tab", "Process PDF", self.create_processor_tab),
+            ("notes_tab", "Saved Notes", self.create_notes_tab),
+            ("generator_tab", "Content Generator", self.create_content_generator_tab),
+            ("professor_tab", "Professor Mode", self.create_professor_mode_tab),
+        ):
+            tab = QWidget()
+            setattr(self, attr, tab)
+            self.tab_widget.addTab(tab, title)
+            self.tab_builders[tab] = builder
+        self.tab_widget.currentChanged.connect(self.on_tab_changed)
+        self.on_tab_changed(self.tab_widget.currentIndex())
         # Status bar
         self.statusBar().showMessage("Ready")
-
-    def get_black_blue_stylesheet(self):
-        return """
-        /* Main window background */
-        QMainWindow, QWidget {
-            background-color: #000000; /* Black */
-            color: #00ccff; /* Bright Blue text */
-        }
-        /* Buttons */
-        QPushButton {
-            background-color: #003366; /* Dark Blue */
-            color: #ffffff; /* White text */
-            border: 1px solid #0055aa; /* Medium Blue border */
-            padding: 10px 15px;
-            border-radius: 6px;
-            font-weight: 600;
-            font-size: 13px;
-        }
-        QPushButton:hover {
-            background-color: #0055aa; /* Medium Blue */
-        }
-        QPushButton:pressed {
-            background-color: #0077cc; /* Lighter Blue */
-        }
-        QPushButton:disabled {
-            background-color: #333333; /* Dark Gray */
-            color: #666666; /* Light Gray text */
-            border: 1px solid #444444;
-        }
-        /* Text Edits */
-        QTextEdit {
-            background-color: #001122; /* Very Dark Blue-Black */
-            color: #00ccff; /* Bright Blue text */
-            border: 1px solid #004477; /* Darker Blue border */
-            border-radius: 6px;
-            padding: 10px;
-            font-family: 'Segoe UI', sans-serif;
-            font-size: 11pt;
-            selection-background-color: #0055aa; /* Medium Blue */
-            selection-color: #ffffff; /* White */
-        }
-        QTextEdit:disabled {
-            background-color: #000a11; /* Even darker */
-            color: #0088aa; /* Muted Blue */
-        }
-        /* Progress Bar */
-        QProgressBar {
-            border: 1px solid #004477;
-            border-radius: 6px;
-            text-align: center;
-            height: 20px;
-            background-color: #001122; /* Dark background */
-        }
-        QProgressBar::chunk {
-            background-color: #0066cc; /* Blue chunk */
-            border-radius: 5px;
-        }
-        /* Labels */
-        QLabel {
-            color: #00ccff; /* Bright Blue text */
-            font-size: 13px;
-        }
-        /* Tab Widget */
-        QTabWidget::pane {
-            border: 1px solid #004477;
-            border-radius: 6px;
-            padding: 5px;
-            background-color: #000000; /* Black */
-        }
-        QTabBar::tab {
-            background: #002244; /* Very Dark Blue */
-            border: 1px solid #004477;
-            padding: 8px 15px;
-            margin-right: 2px;
-            border-top-left-radius: 4px;
-            border-top-right-radius: 4px;
-            color: #00ccff; /* Bright Blue text */
-        }
-        QTabBar::tab:selected {
-            background: #003366; /* Dark Blue */
-            color: #ffffff; /* White text */
-            font-weight: bold;
-        }
-        QTabBar::tab:hover:!selected {
-            background: #004477; /* Slightly lighter on hover */
-        }
-        /* Tree Widgets */
-        QTreeWidget {
-            background-color: #001122; /* Very Dark Blue-Black */
-            alternate-background-color: #000a11; /* Slightly different shade */
-            color: #00ccff; /* Bright Blue text */
-            border: 1px solid #004477;
-            border-radius: 6px;
-            gridline-color: #003366; /* Dark Blue lines */
-        }
-        QTreeWidget::item {
-            padding: 3px;
-        }
-        QTreeWidget::item:selected {
-            background-color: #003366; /* Dark Blue */
-            color: #ffffff; /* White text */
-        }
-        QTreeWidget::item:hover {
-            background-color: #002244; /* Slightly lighter on hover */
-        }
-        QHeaderView::section {
-            background-color: #002244; /* Very Dark Blue header */
-            color: #00ccff; /* Bright Blue text */
-            padding: 5px;
-            border: 1px solid #003366;
-            font-weight: bold;
-        }
-        /* Combo Boxes */
-        QComboBox {
-            background-color: #002244; /* Very Dark Blue */
-            color: #00ccff; /* Bright Blue text */
-            border: 1px solid #004477;
-            border-radius: 4px;
-            padding: 5px;
-            min-height: 20px;
-        }
-        QComboBox:disabled {
-            background-color: #001122;
-            color: #0088aa;
-        }
-        QComboBox QAbstractItemView {
-            background-color: #001122; /* Dropdown background */
-            border: 1px solid #004477;
-            selection-background-color: #003366; /* Dark Blue selection */
-            selection-color: #ffffff; /* White text */
-        }
-        /* Spin Boxes */
-        QSpinBox {
-            background-color: #002244; /* Very Dark Blue */
-            color: #00ccff; /* Bright Blue text */
-            border: 1px solid #004477;
-            border-radius: 4px;
-            padding: 5px;
-        }
-        QSpinBox:disabled {
-            background-color: #001122;
-            color: #0088aa;
-        }
-        QSpinBox::up-button, QSpinBox::down-button {
-            background-color: #003366; /* Dark Blue buttons */
-            border: 1px solid #004477;
-            subcontrol-origin: border;
-            width: 16px;
-        }
-        QSpinBox::up-button:hover, QSpinBox::down-button:hover {
-            background-color: #0055aa; /* Medium Blue on hover */
-        }
-        /* Status Bar */
-        QStatusBar {
-            background-color: #001122; /* Very Dark Blue-Black */
-            color: #00ccff; /* Bright Blue text */
-            border-top: 1px solid #003366;
-        }
-        /* Scrollbars */
-        QScrollBar:vertical {
-            background-color: #001122;
-            width: 15px;
-            margin: 15px 3px 15px 3px;
-            border: 1px solid #003366;
-            border-radius: 4px;
-        }
-        QScrollBar::handle:vertical {
-            background-color: #003366;
-            min-height: 20px;
-            border-radius: 4px;
-        }
-        QScrollBar::handle:vertical:hover {
-            background-color: #0055aa;
-        }
-        QScrollBar::add-line:vertical, QScrollBar::sub-line:vertical {
-            background-color: #002244;
-            height: 12px;
-            subcontrol-origin: margin;
-            border: 1px solid #003366;
-        }
-        QScrollBar:horizontal {
-            background-color: #001122;
-            height: 15px;
-            margin: 3px 15px 3px 15px;
-            border: 1px solid #003366;
-            border-radius: 4px;
-        }
-        QScrollBar::handle:horizontal {
-            background-color: #003366;
-            min-width: 20px;
-            border-radius: 4px;
-        }
-        QScrollBar::handle:horizontal:hover {
-            background-color: #0055aa;
-        }
-        QScrollBar::add-line:horizontal, QScrollBar::sub-line:horizontal {
-            background-color: #002244;
-            width: 12px;
-            subcontrol-origin: margin;
-            border: 1px solid #003366;
-        }
-        """
+        # Start loading the model now so the first request does not pay for it
+        asyncio.run_coroutine_threadsafe(_prewarm("gemma3:4b-it-qat"), _event_loop())
 
     def set_dark_palette(self):
         """Apply a dark palette for better theme consistency."""
-        dark_palette = QPalette()
-        dark_palette.setColor(QPalette.Window, QColor(0, 0, 0)) # Black
-        dark_palette.setColor(QPalette.WindowText, QColor(0, 204, 255)) # Bright Blue
-        dark_palette.setColor(QPalette.Base, QColor(0, 17, 34)) # Very Dark Blue-Black
-        dark_palette.setColor(QPalette.AlternateBase, QColor(0, 10, 17)) # Slightly different shade
-        dark_palette.setColor(QPalette.ToolTipBase, QColor(0, 204, 255)) # Bright Blue
-        dark_palette.setColor(QPalette.ToolTipText, QColor(0, 0, 0)) # Black
-        dark_palette.setColor(QPalette.Text, QColor(0, 204, 255)) # Bright Blue
-        dark_palette.setColor(QPalette.Disabled, QPalette.Text, QColor(0, 136, 170)) # Muted Blue
-        dark_palette.setColor(QPalette.Button, QColor(0, 51, 102)) # Dark Blue
-        dark_palette.setColor(QPalette.ButtonText, QColor(255, 255, 255)) # White
-        dark_palette.setColor(QPalette.BrightText, QColor(255, 0, 0)) # Red (for errors/alerts)
-        dark_palette.setColor(QPalette.Link, QColor(0, 102, 204)) # Blue Link
-        dark_palette.setColor(QPalette.Highlight, QColor(0, 85, 170)) # Medium Blue
-        dark_palette.setColor(QPalette.HighlightedText, QColor(255, 255, 255)) # White
-        dark_palette.setColor(QPalette.PlaceholderText, QColor(0, 136, 170)) # Muted Blue
-        self.setPalette(dark_palette)
+        self.setPalette(_dark_palette())
+
+    def on_tab_changed(self, index):
+        builder = self.tab_builders.pop(self.tab_widget.widget(index), None)
+        if builder:
+            builder()
 
     def create_header(self):
         header_layout = QVBoxLayout()
@@ -439,8 +1028,6 @@ class PDFManagerApp(QMainWindow):
         self.main_layout.addLayout(header_layout)
 
     def create_file_browser_tab(self):
-        self.browser_tab = QWidget()
-        self.tab_widget.addTab(self.browser_tab, "File Browser")
         layout = QVBoxLayout(self.browser_tab)
         # Directory selection
         dir_layout = QHBoxLayout()
@@ -454,13 +1041,11 @@ class PDFManagerApp(QMainWindow):
         dir_layout.addWidget(self.dir_label)
         dir_layout.addWidget(self.refresh_button)
         layout.addLayout(dir_layout)
-        # File tree
-        self.file_tree = QTreeWidget()
-        self.file_tree.setHeaderLabels(["Name", "Type", "Size"])
-        self.file_tree.header().setSectionResizeMode(0, QHeaderView.Stretch)
-        self.file_tree.header().setSectionResizeMode(1, QHeaderView.ResizeToContents)
-        self.file_tree.header().setSectionResizeMode(2, QHeaderView.ResizeToContents)
-        self.file_tree.itemDoubleClicked.connect(self.on_item_double_clicked)
+        # File tree; the model lists directories lazily on its own thread and
+        # watches them for changes, so nothing is scanned up front
+        self.fs_model = None # Created when a directory is first selected
+        self.file_tree = QTreeView()
+        self.file_tree.doubleClicked.connect(self.on_item_double_clicked)
         layout.addWidget(self.file_tree)
         # Action buttons
         action_layout = QHBoxLayout()
@@ -475,8 +1060,6 @@ class PDFManagerApp(QMainWindow):
         layout.addLayout(action_layout)
 
     def create_processor_tab(self):
-        self.processor_tab = QWidget()
-        self.tab_widget.addTab(self.processor_tab, "Process PDF")
         layout = QVBoxLayout(self.processor_tab)
         # File selection
         file_layout = QHBoxLayout()
@@ -510,8 +1093,6 @@ class PDFManagerApp(QMainWindow):
         layout.addWidget(self.export_button)
 
     def create_notes_tab(self):
-        self.notes_tab = QWidget()
-        self.tab_widget.addTab(self.notes_tab, "Saved Notes")
         layout = QHBoxLayout(self.notes_tab)
         # Notes list
         notes_layout = QVBoxLayout()
@@ -550,8 +1131,6 @@ class PDFManagerApp(QMainWindow):
         self.refresh_notes_list()
 
     def create_content_generator_tab(self):
-        self.generator_tab = QWidget()
-        self.tab_widget.addTab(self.generator_tab, "Content Generator")
         layout = QVBoxLayout(self.generator_tab)
         # File selection
         file_layout = QHBoxLayout()
@@ -608,8 +1187,6 @@ class PDFManagerApp(QMainWindow):
         layout.addWidget(self.export_content_button)
 
     def create_professor_mode_tab(self):
-        self.professor_tab = QWidget()
-        self.tab_widget.addTab(self.professor_tab, "Professor Mode")
         layout = QVBoxLayout(self.professor_tab)
         # PDF selection for professor mode
         pdf_layout = QHBoxLayout()
@@ -668,123 +1245,204 @@ class PDFManagerApp(QMainWindow):
             self.populate_file_tree(directory)
 
     def populate_file_tree(self, directory):
-        self.file_tree.clear()
-        self.populate_tree_item(self.file_tree.invisibleRootItem(), Path(directory))
+        if self.fs_model is None:
+            self.fs_model = QFileSystemModel(self)
+            self.fs_model.setFilter(QDir.AllDirs | QDir.Files | QDir.NoDotAndDotDot)
+            self.fs_model.setNameFilters(["*.pdf"])
+            self.fs_model.setNameFilterDisables(False) # Hide non-PDF files instead of greying them out
+            self.file_tree.setModel(self.fs_model)
+            self.file_tree.hideColumn(3) # Date Modified
+            self.file_tree.header().setSectionResizeMode(0, QHeaderView.Stretch)
+            self.file_tree.header().setSectionResizeMode(1, QHeaderView.ResizeToContents)
+            self.file_tree.header().setSectionResizeMode(2, QHeaderView.ResizeToContents)
+        self.file_tree.setRootIndex(self.fs_model.setRootPath(directory))
 
-    def populate_tree_item(self, parent, path):
-        try:
-            for item in path.iterdir():
-                if item.is_dir():
-                    dir_item = QTreeWidgetItem(parent, [item.name, "Directory", ""])
-                    dir_item.setChildIndicatorPolicy(QTreeWidgetItem.ShowIndicator)
-                    dir_item.setData(0, Qt.UserRole, str(item))
-                elif item.suffix.lower() == '.pdf':
-                    size = item.stat().st_size
-                    size_str = self.format_file_size(size)
-                    file_item = QTreeWidgetItem(parent, [item.name, "PDF", size_str])
-                    file_item.setData(0, Qt.UserRole, str(item))
-        except PermissionError:
-            pass
+    def is_pdf_index(self, index):
+        # fileInfo works from any column; the name filter also lets through directories
+        return not self.fs_model.isDir(index) and self.fs_model.fileInfo(index).suffix().lower() == "pdf"
 
-    def format_file_size(self, size_bytes):
-        if size_bytes == 0:
-            return "0 B"
-        size_names = ["B", "KB", "MB", "GB"]
-        i = 0
-        while size_bytes >= 1024 and i < len(size_names) - 1:
-            size_bytes /= 1024.0
-            i += 1
-        return f"{size_bytes:.1f} {size_names[i]}"
+    def selected_pdf_path(self):
+        """Path of the PDF selected in the browser, or None."""
+        indexes = self.file_tree.selectedIndexes()
+        if self.fs_model is None or not indexes or not self.is_pdf_index(indexes[0]):
+            return None
+        return self.fs_model.filePath(indexes[0])
 
     def refresh_file_tree(self):
         directory = self.dir_label.text()
         if directory and directory != "No directory selected":
             self.populate_file_tree(directory)
 
-    def on_item_double_clicked(self, item, column):
-        item_path = item.data(0, Qt.UserRole)
-        if item_path:
-            path = Path(item_path)
-            if path.is_dir():
-                # Expand directory
-                if item.childCount() == 0:
-                    self.populate_tree_item(item, path)
-            elif path.suffix.lower() == '.pdf':
-                self.open_pdf_button.setEnabled(True)
-                self.process_pdf_button.setEnabled(True)
+    def on_item_double_clicked(self, index):
+        # Directories expand on double-click by themselves
+        if self.is_pdf_index(index):
+            self.open_pdf_button.setEnabled(True)
+            self.process_pdf_button.setEnabled(True)
 
     def open_selected_pdf(self):
-        selected_items = self.file_tree.selectedItems()
-        if selected_items:
-            item = selected_items[0]
-            item_path = item.data(0, Qt.UserRole)
-            if item_path:
-                path = Path(item_path)
-                if path.suffix.lower() == '.pdf':
-                    # In a real app, you would open the PDF with system viewer
-                    self.statusBar().showMessage(f"Opening: {path.name}")
+        item_path = self.selected_pdf_path()
+        if item_path:
+            # In a real app, you would open the PDF with system viewer
+            self.statusBar().showMessage(f"Opening: {os.path.basename(item_path)}")
 
     def process_selected_pdf(self):
-        selected_items = self.file_tree.selectedItems()
-        if selected_items:
-            item = selected_items[0]
-            item_path = item.data(0, Qt.UserRole)
-            if item_path:
-                path = Path(item_path)
-                if path.suffix.lower() == '.pdf':
-                    self.file_path = str(path)
-                    self.file_label.setText(path.name)
-                    self.current_pdf_filename = path.name # Store filename
-                    self.tab_widget.setCurrentWidget(self.processor_tab)
-                    self.process_pdf()
+        item_path = self.selected_pdf_path()
+        if item_path:
+            self.tab_widget.setCurrentWidget(self.processor_tab) # Builds the tab if needed
+            self.file_path = item_path
+            self.file_label.setText(os.path.basename(item_path))
+            self.current_pdf_filename = os.path.basename(item_path) # Store filename
+            self.process_pdf()
 
-    def select_file(self):
+    def pick_pdf(self, *, target_attr, label_widget, on_selected=None):
+        """Ask for a PDF, store its path in target_attr, show its name, then call on_selected(path)."""
         file_path, _ = QFileDialog.getOpenFileName(
             self, "Select PDF File", "", "PDF Files (*.pdf)"
         )
         if file_path:
-            self.file_path = file_path
-            self.current_pdf_filename = os.path.basename(file_path) # Store filename
-            self.file_label.setText(os.path.basename(file_path))
-            self.process_button.setEnabled(True)
-            self.preview_area.clear()
-            self.export_button.setEnabled(False)
-            self.progress_bar.setValue(0)
+            setattr(self, target_attr, file_path)
+            label_widget.setText(os.path.basename(file_path))
+            if on_selected:
+                on_selected(file_path)
+
+    def select_file(self):
+        self.pick_pdf(target_attr="file_path", label_widget=self.file_label, on_selected=self.processor_pdf_selected)
+
+    def processor_pdf_selected(self, file_path):
+        self.current_pdf_filename = os.path.basename(file_path) # Store filename
+        self.process_button.setEnabled(True)
+        self.preview_area.clear()
+        self.export_button.setEnabled(False)
+        self.progress_bar.setValue(0)
 
     def select_content_file(self):
-        file_path, _ = QFileDialog.getOpenFileName(
-            self, "Select PDF File", "", "PDF Files (*.pdf)"
-        )
-        if file_path:
-            self.content_file_path = file_path
-            self.content_file_label.setText(os.path.basename(file_path))
-            self.generate_content_button.setEnabled(True)
-            self.content_preview.clear()
-            self.export_content_button.setEnabled(False)
+        self.pick_pdf(target_attr="content_file_path", label_widget=self.content_file_label, on_selected=self.content_pdf_selected)
+
+    def content_pdf_selected(self, file_path):
+        self.generate_content_button.setEnabled(True)
+        self.content_preview.clear()
+        self.export_content_button.setEnabled(False)
 
     def select_professor_pdf(self):
-        file_path, _ = QFileDialog.getOpenFileName(
-            self, "Select PDF File", "", "PDF Files (*.pdf)"
+        self.pick_pdf(target_attr="professor_file_path", label_widget=self.professor_pdf_label, on_selected=self.professor_pdf_selected)
+
+    def professor_pdf_selected(self, file_path):
+        self.ask_question_button.setEnabled(False) # Re-enabled once the text is ready
+        self.answer_area.clear()
+        self.current_pdf_text = ""
+        # Extract text for Q&A
+        self.professor_extract_worker = self.start_extraction(
+            file_path,
+            lambda text, path=file_path: self.professor_text_ready(path, text),
+            lambda message, path=file_path: self.professor_extraction_failed(path, message),
+            max_chars=QA_EXTRACT_MAX_CHARS,
         )
-        if file_path:
-            self.professor_file_path = file_path
-            self.professor_pdf_label.setText(os.path.basename(file_path))
-            self.ask_question_button.setEnabled(True)
-            self.answer_area.clear()
-            # Extract text for Q&A
-            try:
-                self.current_pdf_text = self.extract_text_from_pdf(file_path)
-            except Exception as e:
-                QMessageBox.critical(self, "Error", f"Failed to extract text: {str(e)}")
 
-    def extract_text_from_pdf(self, file_path):
+    def professor_text_ready(self, file_path, text):
+        if file_path != self.professor_file_path:
+            return # A different PDF was selected while this one was extracting
+        self.current_pdf_text = text
+        self.current_pdf_sha = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        if len(text) <= QA_CONTEXT_TOKENS * _CHARS_PER_TOKEN:
+            self.professor_context, self.professor_index = text, None
+        else:
+            # Too long to send whole: each question gets the passages that match it best
+            self.professor_context, self.professor_index = "", self.chunk_index_for(self.current_pdf_sha, text)
+        self.ask_question_button.setEnabled(True)
+
+    def chunk_index_for(self, pdf_sha, text):
+        index = self.chunk_indexes.get(pdf_sha)
+        if index is None:
+            index = ChunkIndex(_recursive_split(text, max_tokens=QA_PASSAGE_TOKENS, overlap=QA_PASSAGE_TOKENS // 10))
+            self.chunk_indexes[pdf_sha] = index
+            while len(self.chunk_indexes) > PDF_TEXT_CACHE_SIZE:
+                self.chunk_indexes.popitem(last=False)
+        else:
+            self.chunk_indexes.move_to_end(pdf_sha)
+        return index
+
+    def professor_extraction_failed(self, file_path, message):
+        if file_path == self.professor_file_path:
+            QMessageBox.critical(self, "Error", f"Failed to extract text: {message}")
+
+    def start_extraction(self, file_path, on_ready, on_error, max_pages=None, max_chars=None):
+        """Deliver the PDF's text to on_ready, extracting on the thread pool unless it is already cached.
+
+        Returns the started ExtractTask (callers keep a reference), or None on a cache hit.
+        """
         try:
-            doc = fitz.open(file_path)
-            text = ""
-            for page_num in range(len(doc)):
-                page = doc.load_page(page_num)
-                text += page.get_text()
-            doc.close()
+            text = self.cached_pdf_text(self.pdf_cache_key(file_path, max_pages, max_chars))
+        except OSError as e:
+            on_error(str(e))
+            return None
+        if text is not None:
+            on_ready(text)
+            return None
+        task = ExtractTask(file_path, functools.partial(self.extract_text_from_pdf, max_pages=max_pages, max_chars=max_chars))
+        task.signals.text_ready.connect(on_ready)
+        task.signals.error.connect(on_error)
+        self.io_pool.start(task)
+        return task
+
+    def pdf_cache_key(self, file_path, max_pages=None, max_chars=None):
+        stat = os.stat(file_path)
+        return (os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size, max_pages, max_chars)
+
+    def cached_pdf_text(self, key):
+        """Return the cached text for a pdf_cache_key, or None.
+
+        A character budget is also met by the whole document's text when that fits within it.
+        """
+        max_pages, max_chars = key[3:]
+        with self.pdf_text_lock: # Also used from extraction tasks on the thread pool
+            text = self.pdf_text_cache.get(key)
+            if text is None and max_chars and max_pages is None:
+                key = key[:3] + (None, None)
+                text = self.pdf_text_cache.get(key)
+                if text is not None and len(text) > max_chars:
+                    text = None
+            if text is not None:
+                self.pdf_text_cache.move_to_end(key)
+            return text
+
+    def extract_text_from_pdf(self, file_path, max_pages=None, max_chars=None):
+        """Return the PDF's text, reusing earlier results while the file is unchanged on disk.
+
+        Reading stops after max_pages pages, or after the page that brings the text to max_chars.
+        """
+        try:
+            key = self.pdf_cache_key(file_path, max_pages, max_chars)
+            text = self.cached_pdf_text(key)
+            if text is not None:
+                return text
+            with _PDF_LOCK, fitz.open(file_path) as doc: # Also covers the pdfium read below
+                total_pages = len(doc)
+                page_count = min(total_pages, max_pages) if max_pages else total_pages
+                # Where a character budget ends is only known by reading the pages in order
+                parallel = (os.cpu_count() or 1) > 1 and page_count >= PARALLEL_EXTRACT_MIN_PAGES and not max_chars
+                if not parallel and pdfium is not None:
+                    try:
+                        text = _extract_text_pdfium(file_path, page_count, max_chars)
+                    except Exception:
+                        text = None # Fall back to PyMuPDF
+                if not parallel and text is None:
+                    parts, length = [], 0
+                    for page in doc.pages(0, page_count):
+                        # sort=False keeps PyMuPDF's native block order; no geometric re-sort
+                        parts.append(page.get_text("text", flags=TEXT_FLAGS, sort=False))
+                        length += len(parts[-1])
+                        if max_chars and length >= max_chars:
+                            break
+                    text = "".join(parts)
+            if parallel:
+                text = extract_pdf_text_parallel(file_path, page_count)
+            if page_count == total_pages and not (max_chars and len(text) >= max_chars):
+                # The budget was never reached, so this is the whole document: store it once for every caller
+                key = key[:3] + (None, None)
+            with self.pdf_text_lock:
+                self.pdf_text_cache[key] = text
+                while len(self.pdf_text_cache) > PDF_TEXT_CACHE_SIZE:
+                    self.pdf_text_cache.popitem(last=False) # Drop the least recently used
             return text
         except Exception as e:
             raise Exception(f"Failed to extract text from PDF: {str(e)}")
@@ -792,67 +1450,70 @@ class PDFManagerApp(QMainWindow):
     def split_text_into_chunks(self, text, max_chunk_size=2500): # Kept for potential use
         """Split text into smaller chunks."""
         text = text.replace('\n', ' ').replace('\r', ' ')
-        sentences = [s.strip() for s in text.split('. ') if s.strip()]
+        sentences = [s.strip() for s in _SENTENCE_END_RE.split(text) if s.strip()]
         chunks = []
-        current_chunk = ""
+        current, current_len = [], 0 # Running length avoids re-measuring the growing chunk
         for sentence in sentences:
-            sentence_with_period = sentence + ". "
+            if len(sentence) > max_chunk_size:
+                # Handle very long sentences by forcing a split on whitespace
+                if current:
+                    chunks.append(" ".join(current))
+                    current, current_len = [], 0
+                chunks.extend(textwrap.wrap(sentence, max_chunk_size, break_long_words=False))
+                continue
             # Check if adding the sentence would exceed the limit
-            test_chunk = current_chunk + sentence_with_period
-            if len(test_chunk) <= max_chunk_size:
-                current_chunk = test_chunk
-            else:
-                # If current_chunk is not empty, save it
-                if current_chunk.strip():
-                    chunks.append(current_chunk.strip())
-                # Start a new chunk. If the sentence itself is too long, it will be split.
-                if len(sentence_with_period) <= max_chunk_size:
-                    current_chunk = sentence_with_period
-                else:
-                    # Handle very long sentences by forcing a split (less ideal but necessary)
-                    # Split the long sentence into parts
-                    words = sentence_with_period.split(' ')
-                    current_chunk = ""
-                    for word in words:
-                        if len(current_chunk) + len(word) + 1 <= max_chunk_size:
-                             current_chunk += word + " "
-                        else:
-                            if current_chunk.strip():
-                                chunks.append(current_chunk.strip())
-                            current_chunk = word + " "
-                    # Add the last part of the long sentence
-                    if current_chunk.strip():
-                        chunks.append(current_chunk.strip())
-                    current_chunk = ""
+            if current and current_len + len(sentence) + 1 > max_chunk_size:
+                chunks.append(" ".join(current))
+                current, current_len = [], 0
+            current.append(sentence)
+            current_len += len(sentence) + 1
         # Add the final chunk if it exists
-        if current_chunk.strip():
-            chunks.append(current_chunk.strip())
+        if current:
+            chunks.append(" ".join(current))
         return chunks
 
     def process_pdf(self):
         if not hasattr(self, 'file_path'):
             return
+        self.preview_area.append("Extracting text from PDF...")
+        self.process_button.setEnabled(False)
+        self.progress_bar.setValue(0)
+        # Extract in the background, then summarize once the text arrives
+        self.extract_worker = self.start_extraction(
+            self.file_path, self.summarize_text, self.summarize_extraction_failed
+        )
+
+    def summarize_extraction_failed(self, message):
+        QMessageBox.critical(self, "Error", f"Failed to process PDF: {message}")
+        self.process_button.setEnabled(True)
+
+    def summarize_text(self, text):
         try:
-            self.preview_area.append("Extracting text from PDF...")
-            text = self.extract_text_from_pdf(self.file_path)
             if not text.strip():
                 QMessageBox.warning(self, "Error", "No text found in PDF")
+                self.process_button.setEnabled(True)
                 return
             self.preview_area.append("Processing full text with Kiri...")
-            self.process_button.setEnabled(False)
-            self.progress_bar.setValue(0)
             # Try to get a topic/title from the first part of the text
             self.current_pdf_topic = self.extract_topic(text[:1000]) # Extract topic from first 1000 chars
-            # --- PROCESS ENTIRE TEXT AT ONCE ---
-            self.worker = SummarizationWorker(text, "gemma3:4b-it-qat", "summary", is_chunked=False)
-            self.worker.output.connect(self.update_preview) # Connect general output
-            self.worker.progress.connect(self.progress_bar.setValue)
-            self.worker.finished_signal.connect(self.summarization_finished)
-            self.worker.start()
+            # Process the entire text at once when it fits the model's context, otherwise in parallel chunks
+            chunks = self.chunks_for_model(text)
+            self.worker = SummarizationTask(chunks or text, "gemma3:4b-it-qat", "summary", is_chunked=bool(chunks))
+            self.worker.signals.output.connect(self.update_preview) # Connect general output
+            self.worker.signals.token.connect(lambda token: self.stream_token(self.preview_area, token))
+            self.worker.signals.progress.connect(self.progress_bar.setValue)
+            self.worker.signals.finished_signal.connect(self.summarization_finished)
+            QThreadPool.globalInstance().start(self.worker)
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to process PDF: {str(e)}")
             self.process_button.setEnabled(True)
 
+    def chunks_for_model(self, text):
+        """Return the text split into chunks if it is too long to send whole, else an empty list."""
+        if len(text) <= FULL_TEXT_MAX_TOKENS * _CHARS_PER_TOKEN:
+            return []
+        return _recursive_split(text)
+
     def extract_topic(self, text_snippet):
         """Simple method to extract a potential topic from the beginning of the text."""
         # Try to find a title-like sentence (shorter, possibly capitalized)
@@ -861,8 +1522,9 @@ class PDFManagerApp(QMainWindow):
             # Basic heuristic: relatively short and mostly capitalized words
             words = sentence.split()
             if 3 <= len(words) <= 10:
-                cap_words = [w for w in words if w.isalpha() and (w.isupper() or w.istitle())]
-                if len(cap_words) / len(words) > 0.5: # More than 50% capitalized/Title case
+                # str case checks rather than a regex, so headings in any script count
+                cap_count = sum(1 for w in words if w.isalpha() and (w.isupper() or w.istitle()))
+                if cap_count / len(words) > 0.5: # More than 50% capitalized/Title case
                     return sentence.rstrip('.') # Remove trailing period for title
         # Fallback: first sentence or snippet
         return sentences[0] if sentences else "PDF Content Summary"
@@ -899,21 +1561,39 @@ class PDFManagerApp(QMainWindow):
                         f"Number each question clearly."
                     )
             self.content_preview.append(f"Generating {selected_type.lower()}...")
-            text = self.extract_text_from_pdf(self.content_file_path)
+            self.generate_content_button.setEnabled(False)
+            self.content_extract_worker = self.start_extraction(
+                self.content_file_path,
+                lambda text: self.generate_from_text(text, content_type, custom_prompt),
+                self.content_extraction_failed,
+            )
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Failed to generate content: {str(e)}")
+            self.generate_content_button.setEnabled(True)
+
+    def content_extraction_failed(self, message):
+        QMessageBox.critical(self, "Error", f"Failed to generate content: {message}")
+        self.generate_content_button.setEnabled(True)
+
+    def generate_from_text(self, text, content_type, custom_prompt):
+        try:
             if not text.strip():
                 QMessageBox.warning(self, "Error", "No text found in PDF")
+                self.generate_content_button.setEnabled(True)
                 return
 
-            # --- PROCESS ENTIRE TEXT AT ONCE for most content types ---
-            # Use chunking only if explicitly needed (e.g., for very large texts or specific types)
-            # For now, we'll try full text first.
-            self.generate_content_button.setEnabled(False)
-            self.content_worker = SummarizationWorker(
-                text, "gemma3:4b-it-qat", content_type, custom_prompt, is_chunked=False # Try full text
+            # Process the entire text at once when it fits the model's context, otherwise in parallel chunks
+            chunks = self.chunks_for_model(text)
+            self.content_worker = SummarizationTask(
+                chunks or text, "gemma3:4b-it-qat", content_type, custom_prompt, is_chunked=bool(chunks)
+            )
+            self.content_worker.signals.output.connect(self.update_content_preview) # Connect general output
+            self.content_worker.signals.chunk_done.connect(
+                lambda index, _: self.update_content_preview(f"Finished chunk {index + 1}.")
             )
-            self.content_worker.output.connect(self.update_content_preview) # Connect general output
-            self.content_worker.finished_signal.connect(self.content_generation_finished)
-            self.content_worker.start()
+            self.content_worker.signals.token.connect(lambda token: self.stream_token(self.content_preview, token))
+            self.content_worker.signals.finished_signal.connect(self.content_generation_finished)
+            QThreadPool.globalInstance().start(self.content_worker)
 
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to generate content: {str(e)}")
@@ -937,56 +1617,116 @@ class PDFManagerApp(QMainWindow):
                 "Comprehensive (2+ paragraphs)": "Comprehensive answer (2+ paragraphs)"
             }
             answer_length = length_map.get(self.answer_length_combo.currentText(), "")
-            # Create prompt with context (limit context size)
-            context_limit = 5000 # Adjust based on model's context window
-            prompt = (
-                f"Based on the following text, please answer this question: {question}\n"
-                f"Context text:\n{self.current_pdf_text[:context_limit]}..."
-            )
+            # Answer straight from the cache if this question was already asked in other words
+            cached_answer = self.qa_cache.lookup(question, self.current_pdf_sha, answer_length)
+            if cached_answer is not None:
+                self.answer_area.append("[System] Answered from cache.\n")
+                self.qa_finished(cached_answer)
+                return
+            self.pending_qa = (question, self.current_pdf_sha, answer_length)
             # Process in background - Single prompt for Q&A
             self.ask_question_button.setEnabled(False)
-            self.qa_worker = SummarizationWorker(
-                prompt, "gemma3:4b-it-qat", "professor",
+            self.qa_worker = SummarizationTask(
+                question, "gemma3:4b-it-qat", "professor",
                 "You are a helpful professor assistant. Answer questions clearly and provide detailed explanations.",
                 answer_length,
-                is_chunked=False # Single prompt
+                is_chunked=False, # Single prompt
+                context=self.professor_context or self.professor_index.context_for(question, QA_CONTEXT_TOKENS * _CHARS_PER_TOKEN)
             )
-            self.qa_worker.output.connect(lambda msg: self.answer_area.append(f"[System] {msg}\n")) # Show system messages
-            self.qa_worker.finished_signal.connect(self.qa_finished)
-            self.qa_worker.start()
+            self.qa_worker.signals.output.connect(self.update_answer_status) # Show system messages
+            self.qa_worker.signals.token.connect(lambda token: self.stream_token(self.answer_area, token, "A: "))
+            self.qa_worker.signals.finished_signal.connect(self.qa_finished)
+            QThreadPool.globalInstance().start(self.qa_worker)
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to process question: {str(e)}")
             self.ask_question_button.setEnabled(True)
 
     def update_preview(self, message):
         """Update the preview area with general processing messages."""
-        self.preview_area.append(f"[{datetime.datetime.now().strftime('%H:%M:%S')}] {message}")
-        self.preview_area.moveCursor(QTextCursor.End) # Auto-scroll to bottom - FIXED
+        self.queue_status(self.preview_area, message)
 
     def update_content_preview(self, message):
         """Update the content preview area with general processing messages."""
-        self.content_preview.append(f"[{datetime.datetime.now().strftime('%H:%M:%S')}] {message}")
-        self.content_preview.moveCursor(QTextCursor.End) # Auto-scroll to bottom - FIXED
+        self.queue_status(self.content_preview, message)
+
+    def queue_status(self, text_edit, message):
+        """Queue a timestamped status line; queued lines are drawn together every ~50 ms."""
+        if self.stream_buffers:
+            self.flush_stream_buffers() # Keep streamed text ahead of later messages
+        if not self.status_buffers:
+            QTimer.singleShot(50, self.flush_status_buffers)
+        self.status_buffers.setdefault(text_edit, []).append(message)
+
+    def flush_status_buffers(self):
+        """Draw queued status lines with one timestamp and one append per text area."""
+        if not self.status_buffers:
+            return
+        stamp = datetime.datetime.now().strftime('%H:%M:%S')
+        for text_edit, messages in self.status_buffers.items():
+            text_edit.append("\n".join(f"[{stamp}] {message}" for message in messages))
+            text_edit.moveCursor(QTextCursor.End) # Auto-scroll to bottom
+        self.status_buffers.clear()
+
+    def update_answer_status(self, message):
+        """Show a worker status message in the professor answer area."""
+        self.flush_stream_buffers() # Keep streamed text ahead of later messages
+        self.answer_area.append(f"[System] {message}\n")
+
+    def stream_token(self, text_edit, token, prefix=""):
+        """Queue a streamed piece of a response; queued text is drawn at most ~60 times a second."""
+        if not self.stream_buffers:
+            QTimer.singleShot(16, self.flush_stream_buffers)
+        self.stream_buffers.setdefault(text_edit, (prefix, []))[1].append(token)
+
+    def flush_stream_buffers(self):
+        """Draw queued streamed text, starting a new paragraph for each response."""
+        self.flush_status_buffers() # Status lines queued before this text come first
+        for text_edit, (prefix, tokens) in self.stream_buffers.items():
+            if text_edit not in self.streaming_areas:
+                self.streaming_areas.add(text_edit)
+                text_edit.append(prefix)
+            text_edit.moveCursor(QTextCursor.End)
+            text_edit.insertPlainText("".join(tokens))
+        self.stream_buffers.clear()
 
     def summarization_finished(self, final_summary):
+        self.flush_stream_buffers()
+        self.streaming_areas.discard(self.preview_area)
         self.final_summary = final_summary
         self.process_button.setEnabled(True)
         self.export_button.setEnabled(True)
         self.preview_area.append("\n--- PROCESSING COMPLETE ---\n")
         # Save to notes
-        self.save_note(final_summary)
-        self.refresh_notes_list()
+        self.show_note_item(self.save_note(final_summary))
         QMessageBox.information(self, "Success", "Summary generation completed!")
 
     def content_generation_finished(self, final_content):
+        self.flush_stream_buffers()
+        self.streaming_areas.discard(self.content_preview)
         self.generated_content = final_content
+        self.generated_content_type = self.content_worker.prompt_type
+        # For generated content, derive topic from content if possible
+        self.generated_content_topic = self.extract_topic(final_content[:1000]) if final_content else "Generated Content"
         self.generate_content_button.setEnabled(True)
         self.export_content_button.setEnabled(True)
         self.content_preview.append("\n--- GENERATION COMPLETE ---\n")
         QMessageBox.information(self, "Success", "Content generation completed!")
 
     def qa_finished(self, answer):
-        self.answer_area.append(f"A: {answer}\n")
+        pending_qa = getattr(self, 'pending_qa', None)
+        # Failed chunks are marked [ERROR]; a failure of the whole task is [FATAL ERROR]
+        failed = "[ERROR]" in answer or "[FATAL ERROR]" in answer
+        if pending_qa and not failed:
+            write = self.qa_cache.add(*pending_qa, answer)
+            if write is not None:
+                self.write_pool.start(WriteTask(write))
+        self.pending_qa = None
+        # A streamed answer is already on screen unless the request failed part way
+        self.flush_stream_buffers()
+        streamed = self.answer_area in self.streaming_areas
+        self.streaming_areas.discard(self.answer_area)
+        if not streamed or failed:
+            self.answer_area.append(f"A: {answer}\n")
         self.answer_area.append("---\n")
         self.ask_question_button.setEnabled(True)
         self.question_input.clear()
@@ -995,47 +1735,156 @@ class PDFManagerApp(QMainWindow):
         self.question_input.clear()
         self.answer_area.clear()
 
-    def save_note(self, content):
+    def save_note(self, content, content_type="summary", topic=None):
         note_id = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
         note_data = {
             "id": note_id,
             "filename": self.current_pdf_filename if hasattr(self, 'current_pdf_filename') and self.current_pdf_filename else "Unknown",
             "created": datetime.datetime.now().isoformat(),
-            "content": content
+            "content": content,
+            "content_type": content_type,
+            "topic": self.current_pdf_topic if topic is None else topic
         }
+        if note_id in self.notes:
+            self.stale_note_records += 1
         self.notes[note_id] = note_data
-        self.save_notes()
+        self.append_note_record(note_data)
+        return note_id
 
     def load_notes(self):
+        """Replay the notes log; deleted notes are stored as {"id": ..., "deleted": true}."""
+        notes = {}
         if os.path.exists(self.notes_file):
             try:
-                with open(self.notes_file, 'r') as f:
+                with open(self.notes_file, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        try:
+                            record = json.loads(line)
+                        except ValueError:
+                            continue # Skip a line cut short by a crash mid-write
+                        note_id = record.get("id")
+                        if note_id in notes:
+                            self.stale_note_records += 1
+                        if record.get("deleted"):
+                            notes.pop(note_id, None)
+                            self.stale_note_records += 1
+                        elif note_id:
+                            notes[note_id] = record
+            except Exception:
+                return {}
+            self.notes = notes
+            if self.stale_note_records >= NOTES_COMPACT_THRESHOLD:
+                self.compact_notes()
+        elif os.path.exists(self.legacy_notes_file):
+            try:
+                with open(self.legacy_notes_file, 'r') as f:
                     data = json.load(f)
-                    return data if isinstance(data, dict) else {}
+                notes = data if isinstance(data, dict) else {}
             except Exception:
                 return {}
-        return {}
+            self.notes = notes
+            self.compact_notes()
+        return notes
+
+    def append_note_record(self, record):
+        """Queue a log record; queued records are written together shortly afterwards."""
+        if not self.pending_note_records:
+            QTimer.singleShot(NOTES_FLUSH_DELAY_MS, self.flush_notes)
+        self.pending_note_records.append(record)
+
+    def flush_notes(self, background=True):
+        """Write queued records, compacting the log instead once enough of it is stale."""
+        if not self.pending_note_records:
+            return
+        if self.stale_note_records >= NOTES_COMPACT_THRESHOLD:
+            # The rewrite holds every live note, so the queued records are covered by it
+            write = functools.partial(self.write_notes_log, compacted=list(self.notes.values()))
+            self.stale_note_records = 0
+        else:
+            write = functools.partial(self.write_notes_log, records=self.pending_note_records)
+        self.pending_note_records = []
+        if background:
+            self.notes_writer = WriteTask(write)
+            self.notes_writer.signals.error.connect(self.notes_write_failed)
+            self.write_pool.start(self.notes_writer)
+        else:
+            try:
+                write()
+            except Exception as e:
+                self.notes_write_failed(str(e))
+
+    def write_notes_log(self, records=(), compacted=None):
+        """Append records to the log, or atomically replace it with the compacted notes."""
+        if compacted is None:
+            with open(self.notes_file, 'a', encoding='utf-8') as f:
+                f.writelines(json.dumps(record, separators=(',', ':')) + "\n" for record in records)
+            return
+        tmp_file = self.notes_file + ".tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            f.writelines(json.dumps(note, separators=(',', ':')) + "\n" for note in compacted)
+        os.replace(tmp_file, self.notes_file)
+
+    def notes_write_failed(self, message):
+        QMessageBox.critical(self, "Error", f"Failed to save notes: {message}")
 
-    def save_notes(self):
+    def compact_notes(self):
+        """Rewrite the log with only the live notes, dropping superseded and deleted records."""
         try:
-            with open(self.notes_file, 'w') as f:
-                json.dump(self.notes, f, indent=2)
+            self.write_notes_log(compacted=list(self.notes.values()))
+            self.stale_note_records = 0
         except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to save notes: {str(e)}")
+            self.notes_write_failed(str(e))
+
+    def closeEvent(self, event):
+        self.write_pool.waitForDone() # Earlier background writes must land first
+        self.flush_notes(background=False) # Don't lose notes saved in the last moments
+        super().closeEvent(event)
 
     def refresh_notes_list(self):
+        if self.notes_tab in self.tab_builders:
+            return # Not built yet; the list is filled when the tab is first shown
         self.notes_list.clear()
-        for note_id, note in self.notes.items():
-            created = datetime.datetime.fromisoformat(note['created'])
-            formatted_date = created.strftime("%Y-%m-%d %H:%M")
-            item = QTreeWidgetItem([
-                note['filename'],
-                formatted_date,
-                note_id
-            ])
-            item.setData(0, Qt.UserRole, note_id)
+        self.notes_items.clear()
+        self.notes_order = sorted((note['created'], note_id) for note_id, note in self.notes.items())
+        for _, note_id in self.notes_order:
+            item = self.make_note_item(note_id)
+            self.notes_items[note_id] = item
             self.notes_list.addTopLevelItem(item)
 
+    def make_note_item(self, note_id):
+        note = self.notes[note_id]
+        created = datetime.datetime.fromisoformat(note['created'])
+        formatted_date = created.strftime("%Y-%m-%d %H:%M")
+        item = QTreeWidgetItem([
+            note['filename'],
+            formatted_date,
+            note_id
+        ])
+        item.setData(0, Qt.UserRole, note_id)
+        return item
+
+    def show_note_item(self, note_id):
+        """Add or update one note's row without rebuilding the list."""
+        if self.notes_tab in self.tab_builders:
+            return
+        if note_id in self.notes_items:
+            self.hide_note_item(note_id) # Its creation time, and so its position, may have changed
+        key = (self.notes[note_id]['created'], note_id)
+        row = bisect.bisect(self.notes_order, key) # Rows are kept in (created, id) order
+        self.notes_order.insert(row, key)
+        item = self.make_note_item(note_id)
+        self.notes_items[note_id] = item
+        self.notes_list.insertTopLevelItem(row, item)
+
+    def hide_note_item(self, note_id):
+        """Remove one note's row without rebuilding the list."""
+        item = self.notes_items.pop(note_id, None)
+        if item is None:
+            return
+        row = self.notes_list.indexOfTopLevelItem(item)
+        self.notes_list.takeTopLevelItem(row)
+        del self.notes_order[row]
+
     def on_note_selected(self):
         selected_items = self.notes_list.selectedItems()
         if selected_items:
@@ -1062,8 +1911,9 @@ class PDFManagerApp(QMainWindow):
             )
             if reply == QMessageBox.Yes:
                 del self.notes[self.current_note_id]
-                self.save_notes()
-                self.refresh_notes_list()
+                self.append_note_record({"id": self.current_note_id, "deleted": True})
+                self.stale_note_records += 2 # The note's record and its tombstone
+                self.hide_note_item(self.current_note_id)
                 self.note_content.clear()
                 self.export_note_button.setEnabled(False)
                 self.delete_note_button.setEnabled(False)
@@ -1080,7 +1930,7 @@ class PDFManagerApp(QMainWindow):
                 if not file_path.endswith('.docx'):
                     file_path += '.docx'
                 # Pass the topic and filename to the export function
-                self.create_word_document(file_path, self.final_summary, self.current_pdf_filename, self.current_pdf_topic)
+                self.create_word_document(file_path, self.final_summary, self.current_pdf_filename, self.current_pdf_topic, "summary")
                 QMessageBox.information(self, "Success", "Word document exported successfully!")
             except Exception as e:
                 QMessageBox.critical(self, "Error", f"Failed to export Word document: {str(e)}")
@@ -1096,10 +1946,12 @@ class PDFManagerApp(QMainWindow):
             try:
                 if not file_path.endswith('.docx'):
                     file_path += '.docx'
-                # For existing notes, we don't have the original topic, so use filename or generic
                 note_filename = note.get('filename', 'Unknown')
-                note_topic = self.extract_topic(note.get('content', '')[:1000]) if note.get('content') else "Note Content"
-                self.create_word_document(file_path, note['content'], note_filename, note_topic)
+                note_topic = note.get('topic')
+                if note_topic is None: # Notes saved before topics were stored
+                    note_topic = self.extract_topic(note.get('content', '')[:1000]) if note.get('content') else "Note Content"
+                # Only summaries were saved as notes before the content type was stored
+                self.create_word_document(file_path, note['content'], note_filename, note_topic, note.get('content_type', "summary"))
                 QMessageBox.information(self, "Success", "Word document exported successfully!")
             except Exception as e:
                 QMessageBox.critical(self, "Error", f"Failed to export Word document: {str(e)}")
@@ -1114,17 +1966,17 @@ class PDFManagerApp(QMainWindow):
             try:
                 if not file_path.endswith('.docx'):
                     file_path += '.docx'
-                content_type = self.content_type_combo.currentText().lower().replace(" ", "_")
-                filename = f"generated_{content_type}"
-                # For generated content, derive topic from content if possible
-                content_topic = self.extract_topic(self.generated_content[:1000]) if self.generated_content else "Generated Content"
-                self.create_word_document(file_path, self.generated_content, filename, content_topic)
+                filename = f"generated_{self.generated_content_type}"
+                self.create_word_document(file_path, self.generated_content, filename, self.generated_content_topic, self.generated_content_type)
                 QMessageBox.information(self, "Success", "Word document exported successfully!")
             except Exception as e:
                 QMessageBox.critical(self, "Error", f"Failed to export Word document: {str(e)}")
 
-    def create_word_document(self, file_path, content, filename="PDF Summary", topic=""):
-        """Create a Word document with the content, filename, and topic."""
+    def create_word_document(self, file_path, content, filename, topic, content_type):
+        """Create a Word document with the content, filename, and topic.
+
+        content_type picks the line formatting ("qna", "questions", anything else as a summary).
+        """
         doc = Document()
         # Determine document title
         if topic and topic != "PDF Content Summary":
@@ -1156,6 +2008,26 @@ class PDFManagerApp(QMainWindow):
         else:
             sections = [content]
 
+        line_re = _DOCX_LINE_RES.get(content_type, _DOCX_LINE_RES["summary"])
+
+        # Content lines are built as raw <w:p> elements, skipping python-docx's per-paragraph
+        # proxy objects and style lookups; styles are resolved to their IDs once here.
+        style_ids = {name: doc.styles[name].style_id for name in ("List Bullet", "List Bullet 2", "List Number")}
+        body = doc.element.body
+        insert = body.sectPr.addprevious if body.sectPr is not None else body.append # Keep sectPr last
+
+        def add_line(text, style=None, bold=False):
+            insert(_docx_paragraph(text, style_ids.get(style), bold))
+
+        # One writer per named group in the line regexes
+        writers = {
+            "question": lambda text: add_line(text, bold=True),
+            "answer": lambda text: add_line(text, "List Bullet"),
+            "number": lambda text: add_line(text, "List Number"),
+            "bullet": lambda text: add_line(text, "List Bullet", bold=True), # Main bullet point
+            "sub_bullet": lambda text: add_line(text, "List Bullet 2"),
+            "rule": lambda text: None, # Drop separator lines
+        }
         for i, section in enumerate(sections):
             if len(sections) > 1:
                 section_header = doc.add_heading(f'Section {i+1}', level=1)
@@ -1165,57 +2037,16 @@ class PDFManagerApp(QMainWindow):
                 error_para = doc.add_paragraph()
                 error_para.add_run(f"[ERROR] {section}").font.color.rgb = RGBColor(244, 67, 54) # Red for errors
             else:
-                # For Q&A and Questions, format appropriately
-                content_type = "summary" # Default assumption
-                if filename and "qna" in filename.lower() or "Q:" in section[:100]:
-                    content_type = "qna"
-                elif filename and "question" in filename.lower() or any(c.isdigit() and '.' in c for c in section[:200].split('\n')[:5]):
-                     content_type = "questions"
-
-                if content_type == "qna":
-                     lines = section.split('\n')
-                     for line in lines:
-                         if line.strip():
-                            if line.startswith('Q:'):
-                                p = doc.add_paragraph()
-                                p.add_run(line).bold = True
-                            elif line.startswith('A:'):
-                                p = doc.add_paragraph(style='List Bullet')
-                                p.add_run(line.lstrip('A: ').strip())
-                            else:
-                                # Handle potential continuation lines or errors in Q&A format
-                                doc.add_paragraph(line)
-                elif content_type == "questions":
-                    lines = section.split('\n')
-                    for line in lines:
-                         if line.strip():
-                            # Check if it's a numbered list item
-                            if line[0].isdigit() and (line[1:3] in ['.', ')'] or (len(line) > 2 and line[2] in ['.', ')'])):
-                                p = doc.add_paragraph(style='List Number')
-                                # Extract text after number
-                                parts = line.split(' ', 1)
-                                p.add_run(parts[1] if len(parts) > 1 else line)
-                            else:
-                                doc.add_paragraph(line)
-                else:
-                    # Default paragraph/bullet handling for summaries/briefs
-                    lines = section.split('\n')
-                    for line in lines:
-                        if line.strip() and not line.startswith('---'):
-                            clean_line = line.strip()
-                            if clean_line.startswith('•'):
-                                # Main bullet point
-                                p = doc.add_paragraph()
-                                p.style = doc.styles['List Bullet']
-                                p.add_run(clean_line.lstrip('• ')).bold = True
-                            elif clean_line.startswith('-'):
-                                # Sub-bullet point
-                                p = doc.add_paragraph()
-                                p.style = doc.styles['List Bullet 2']
-                                p.add_run(clean_line.lstrip('- '))
-                            elif clean_line:
-                                # Regular text
-                                doc.add_paragraph(clean_line) # Add as paragraph
+                for line in section.split('\n'):
+                    line = line.strip()
+                    if not line:
+                        continue
+                    match = line_re.match(line)
+                    if match:
+                        kind = match.lastgroup
+                        writers[kind](match.group(kind))
+                    else:
+                        add_line(line) # Regular text
             if i < len(sections) - 1:
                 doc.add_paragraph()
         doc.save(file_path)
@@ -1224,7 +2055,16 @@ class PDFManagerApp(QMainWindow):
 from PyQt5.QtWidgets import QInputDialog
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support() # Needed by the extraction pool in frozen Windows builds
+    if "OLLAMA_NUM_PARALLEL" not in os.environ:
+        print(
+            "Warning: OLLAMA_NUM_PARALLEL is not set; chunked requests may be queued "
+            "one at a time by the Ollama server.",
+            file=sys.stderr
+        )
     app = QApplication(sys.argv)
+    # Bound the worker threads to what the Ollama server runs in parallel; extra jobs queue
+    QThreadPool.globalInstance().setMaxThreadCount(max(2, _env_int("OLLAMA_NUM_PARALLEL", 4)))
     window = PDFManagerApp()
     window.show()
     sys.exit(app.exec_())
\ No newline at end of file
@@ -0,0 +1,60 @@
+"""PDF text extraction across worker processes.
+
+Kept apart from Kiri.py and importing nothing but PyMuPDF, so the spawned workers
+start in a fraction of the time it would take to load Qt and the Ollama client.
+One pool is started on first use and kept for the life of the app.
+"""
+import os
+import sys
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import fitz  # PyMuPDF
+
+# Plain text only: skip images and expand ligatures into ordinary letters
+TEXT_FLAGS = fitz.TEXT_PRESERVE_WHITESPACE | fitz.TEXT_MEDIABOX_CLIP
+
+def extract_page_range(args):
+    """Extract the text of pages [start, stop) of a PDF; runs in a worker process."""
+    file_path, start, stop = args
+    with fitz.open(file_path) as doc:
+        return "".join(doc[i].get_text("text", flags=TEXT_FLAGS) for i in range(start, stop))
+
+_POOL = None
+_POOL_LOCK = threading.Lock()
+
+def _pool():
+    """Return the shared worker pool, starting its processes on first use."""
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            # Always spawn: forking would copy a process that is already running Qt and asyncio threads
+            pool = ProcessPoolExecutor(max_workers=os.cpu_count() or 1, mp_context=multiprocessing.get_context("spawn"))
+            # Spawned workers re-import the main module, by file or by name under -m. Hide both
+            # while the first submit starts every worker, so they load only this module and PyMuPDF.
+            # The lock keeps a concurrent extraction from seeing the main module half-hidden.
+            main = sys.modules["__main__"]
+            main_file, main_spec = main.__dict__.pop("__file__", None), getattr(main, "__spec__", None)
+            main.__spec__ = None
+            try:
+                pool.submit(int).result()
+            finally:
+                main.__spec__ = main_spec
+                if main_file is not None:
+                    main.__file__ = main_file
+            _POOL = pool
+        return _POOL
+
+def extract_pdf_text_parallel(file_path, page_count):
+    """Extract a large PDF by giving each CPU core a contiguous range of pages."""
+    workers = min(os.cpu_count() or 1, page_count)
+    step = -(-page_count // workers) # Ceiling division
+    ranges = [(file_path, start, min(start + step, page_count)) for start in range(0, page_count, step)]
+    try:
+        return "".join(_pool().map(extract_page_range, ranges))
+    except BrokenProcessPool:
+        global _POOL
+        with _POOL_LOCK:
+            _POOL = None # A worker died; start a fresh pool next time
+        raise